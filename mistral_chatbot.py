@@ -12,14 +12,83 @@ import streamlit as st
 # 'streamlit' is like a toolbox that helps us create websites easily
 # We nickname it 'st' so we don't have to type 'streamlit' every time
 
+import os
+# 'os' lets us read settings from the environment (like which
+# backend server to use, if any)
+
 import requests
 # 'requests' helps our program talk to the internet
 # We use it to send messages to Mistral AI and get responses back
 
+from requests.adapters import HTTPAdapter, Retry
+# These two help us reuse internet connections and retry failed ones
+# (more on this in Step 7 where we set up our 'Session')
+
+import re
+# 're' finds patterns in text; we use a pre-compiled pattern to pick
+# apart the streamed answer lines quickly
+
+import gzip
+# 'gzip' squashes data before it travels over the internet
+# (mostly-English chat text typically shrinks 3-5x)
+
+# (optional extras like httpx, numpy, brotli, and the embedding model
+# are imported lazily further down, inside @st.cache_resource loaders -
+# Streamlit re-runs this whole file constantly, and probing for a
+# missing package is slow, so we make sure each probe happens only once)
+
 import json
 # 'json' helps us organize data in a format that computers understand
 # It's like putting things in labeled boxes
 
+try:
+    import orjson
+    # 'orjson' does the same job as 'json' but is written in Rust,
+    # so it's several times faster - which matters when a streamed
+    # answer arrives as hundreds of little JSON pieces
+    ORJSON_AVAILABLE = True
+except ImportError:
+    # No orjson? The built-in json works fine, just a bit slower
+    ORJSON_AVAILABLE = False
+
+
+def json_dumps(obj):
+    """Turn a Python object into JSON bytes, the fast way if we can"""
+
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+
+    # The built-in json gives us text, so we convert it to bytes
+    # to match what orjson produces
+    return json.dumps(obj).encode("utf-8")
+
+
+def json_loads(data):
+    """Turn JSON text (or bytes) back into a Python object"""
+
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+import asyncio
+# 'asyncio' lets Python do other work while it waits for the internet
+# (like reading a book while you wait for the kettle to boil)
+
+import threading
+# 'threading' lets us run the asyncio event loop on its own background
+# thread, so every visitor's session can safely share it
+
+import hashlib
+# 'hashlib' turns text into a scrambled fingerprint
+# We use it so we never store your real API key, only its fingerprint
+
+from collections import OrderedDict, deque
+# An OrderedDict is a dictionary that remembers the order things went in
+# Perfect for a cache where we throw out the oldest entry first
+# A deque is a list that can automatically drop its oldest items
+# once it reaches a maximum length - ideal for chat history
+
 # --------------------------------------------
 # STEP 2: Set Up the Page (Make it look nice)
 # --------------------------------------------
@@ -76,15 +145,32 @@ with st.sidebar:
     
     st.markdown("---")
     # Another horizontal line
-    
+
+    use_server_conversation = st.checkbox(
+        "♻️ Let Mistral remember the conversation (beta)"
+    )
+    # When ticked, Mistral keeps the chat history on ITS servers, so we
+    # only upload your newest message each turn (instead of re-sending
+    # the whole conversation). Faster and cheaper for long chats, but
+    # answers arrive all at once rather than word by word.
+
     # Add a button to clear the chat
     if st.button("🗑️ Clear Chat History"):
         # This creates a clickable button
         # The 'if' means: "if someone clicks this button, do the following:"
         
-        st.session_state.messages = []
+        st.session_state.roles.clear()
+        st.session_state.contents.clear()
         # This empties our chat history (like erasing a whiteboard)
-        
+
+        st.session_state.pop("summary", None)
+        st.session_state.pop("summary_refreshed_at", None)
+        # Also forget the summary of the old conversation (if we had one)
+
+        st.session_state.pop("conv_id", None)
+        st.session_state.pop("conv_fingerprint", None)
+        # And let go of any server-side conversation too
+
         st.rerun()
         # This refreshes the page to show the empty chat
 
@@ -92,158 +178,1093 @@ with st.sidebar:
 # STEP 5: Initialize Chat History (Set up memory)
 # --------------------------------------------
 
-if "messages" not in st.session_state:
+# The most messages we'll ever keep around
+# (a deque with maxlen quietly drops the oldest once it's full,
+# so a marathon session can't eat memory forever)
+MAX_HISTORY = 500
+
+if "roles" not in st.session_state:
     # This checks: "Do we already have a chat history saved?"
     # st.session_state is like the app's memory
-    
-    st.session_state.messages = []
-    # If we don't have a chat history, create an empty one
-    # [] means an empty list (like an empty shopping list)
+
+    # We keep the history as TWO parallel lists instead of one list
+    # of dictionaries: one holds who spoke, the other what they said.
+    # Item number 3 in 'roles' always pairs with item number 3 in
+    # 'contents'. This keeps the display loop simple and lets us hand
+    # the contents straight to the embedder as one batch if we want.
+    st.session_state.roles = deque(maxlen=MAX_HISTORY)
+    st.session_state.contents = deque(maxlen=MAX_HISTORY)
+
+
+def history_messages():
+    """
+    Rebuild the [{"role": ..., "content": ...}] list Mistral expects
+
+    Our history lives as two parallel lists (see above); the API wants
+    one list of dictionaries, so we zip them back together on demand.
+    """
+
+    return [
+        {"role": role, "content": content}
+        for role, content in zip(st.session_state.roles, st.session_state.contents)
+    ]
+
+
+def append_history(role, content):
+    """Add one message to both parallel lists at once"""
+
+    st.session_state.roles.append(role)
+    st.session_state.contents.append(content)
 
 # --------------------------------------------
 # STEP 6: Display Previous Messages (Show old conversation)
 # --------------------------------------------
 
-for message in st.session_state.messages:
-    # This goes through each message we saved before
-    # It's like reading through your text message history
-    
-    with st.chat_message(message["role"]):
-        # This creates a chat bubble
-        # message["role"] tells us if it's from "user" or "assistant"
-        
-        st.markdown(message["content"])
-        # This displays the actual message text inside the bubble
+@st.cache_data(show_spinner=False)
+def render_message_text(content):
+    """
+    Hand back a message's text through Streamlit's memo cache
+
+    Streamlit re-runs this whole script on every interaction (even
+    while you're still typing!), which means the history loop below
+    runs again and again. Routing each message through a cached
+    function lets Streamlit recognise "same text as last time" and
+    reuse its previous work instead of treating it as brand new.
+    """
+
+    return content
+    # The text itself is the cache key, so repeats are free
+
+
+# The loop that actually shows the messages lives inside chat_panel()
+# down in Step 8 - the display and the input box share a 'fragment'
+# so sending a message only re-runs that little corner of the app
 
 # --------------------------------------------
 # STEP 7: Define Function to Call Mistral AI
 # --------------------------------------------
 
+# The settings we always send to Mistral, gathered in one place
+MODEL = "mistral-small-latest"  # Which AI brain to use
+TEMPERATURE = 0.7  # How creative the AI should be (0-1, higher = more creative)
+MAX_TOKENS = 1000  # Maximum length of response (like a word limit)
+
+# How many finished answers we remember (see the cache below)
+CACHE_MAX_ENTRIES = 256
+
+# Pre-compiled patterns for picking apart streamed answer lines
+# ("data: {...}" arrives hundreds of times per answer, so compiling
+# the pattern ONCE and matching in C beats slicing strings in Python)
+SSE_DATA_BYTES = re.compile(rb"^data: (.*)$")  # for 'requests' (bytes)
+SSE_DATA_TEXT = re.compile(r"^data: (.*)$")  # for 'httpx' (text)
+
+# The part of the request body that never changes between turns,
+# encoded ONCE when the app starts. We chop off the closing "}" so
+# each turn only has to glue on its messages and close the brace -
+# no rebuilding and re-encoding the same settings every message
+PAYLOAD_PREFIX = json_dumps({
+    "model": MODEL,
+    "temperature": TEMPERATURE,
+    "max_tokens": MAX_TOKENS,
+    "stream": True
+})[:-1]
+
+
+def build_payload_bytes(messages):
+    """
+    Assemble the full request body for a streamed chat completion
+
+    The constant settings are already encoded in PAYLOAD_PREFIX, so
+    per turn we only encode the messages (the one part that changes)
+    and stitch the pieces together.
+    """
+
+    return PAYLOAD_PREFIX + b',"messages":' + json_dumps(messages) + b"}"
+
+
+# Bodies smaller than this travel as-is - squashing tiny payloads
+# costs more CPU than the few bytes it saves
+COMPRESS_MIN_BYTES = 4096
+
+# Compressing UPLOADS is off unless you switch it on: Mistral's API
+# doesn't promise to accept gzipped request bodies, and if the server
+# refused them, every long conversation would suddenly start failing.
+# Set MISTRAL_GZIP_UPLOADS=1 if your endpoint is known to accept them.
+# (Asking for compressed REPLIES via Accept-Encoding is always safe
+# and stays on regardless - servers only use encodings they support.)
+GZIP_UPLOADS = os.environ.get("MISTRAL_GZIP_UPLOADS", "") == "1"
+
+
+def compress_if_large(body, headers):
+    """
+    Gzip a request body when it's big enough to be worth it
+    (and only when uploads compression is switched on - see above)
+
+    Long chat histories are multi-kilobyte blocks of mostly-English
+    text, which gzip shrinks several times over - fewer bytes on the
+    wire means the request arrives (and the answer starts) sooner.
+    The Content-Encoding header tells Mistral how to unpack it.
+    """
+
+    if GZIP_UPLOADS and len(body) > COMPRESS_MIN_BYTES:
+        headers["Content-Encoding"] = "gzip"
+        return gzip.compress(body)
+
+    return body
+
+
+@st.cache_resource
+def get_response_cache():
+    """
+    This function creates ONE shared 'answer notebook' for the whole app
+
+    Every time Mistral finishes an answer, we jot it down in here.
+    If the exact same conversation comes up again, we read the answer
+    straight from the notebook instead of paying for another API call.
+
+    @st.cache_resource keeps the notebook alive across Streamlit reruns.
+    """
+
+    return OrderedDict()
+    # Starts empty; we fill it in as answers come back
+
+
+def make_cache_key(messages, api_key):
+    """
+    This function builds the 'label' we file an answer under
+
+    The label includes the WHOLE conversation so far (not just the last
+    question), plus the model settings - so two chats only share an
+    answer if everything leading up to it was identical.
+
+    Lists can't be used as dictionary keys, so we freeze the messages
+    into a tuple. And we fingerprint the API key with sha256 instead of
+    storing the real thing.
+    """
+
+    # Freeze each message into an unchangeable (role, content) pair
+    messages_tuple = tuple((m["role"], m["content"]) for m in messages)
+
+    # Fingerprint the API key (one-way scramble, can't be reversed)
+    api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+
+    return (messages_tuple, MODEL, TEMPERATURE, MAX_TOKENS, api_key_hash)
+
+
+def cache_lookup(key):
+    """
+    Look up a finished answer by its label, or None if we don't have one
+
+    On a hit we also move the entry to the 'newest' end of the notebook,
+    so frequently-used answers stick around longest (this is called LRU:
+    Least Recently Used entries get evicted first).
+    """
+
+    cache = get_response_cache()
+
+    if key in cache:
+        # Found it! Mark it as freshly used and hand it back
+        cache.move_to_end(key)
+        return cache[key]
+
+    return None
+    # Not in the notebook - the caller will have to ask Mistral
+
+
+def cache_store(key, answer):
+    """
+    Jot a finished answer down in the notebook
+
+    If the notebook is full, tear out the oldest page first.
+    """
+
+    cache = get_response_cache()
+    cache[key] = answer
+    cache.move_to_end(key)
+
+    # Keep the notebook from growing forever
+    while len(cache) > CACHE_MAX_ENTRIES:
+        cache.popitem(last=False)
+        # last=False means "remove from the OLD end"
+
+
+@st.cache_resource
+def load_numpy():
+    """
+    Import numpy exactly once per process (or learn that it's missing)
+
+    'numpy' does math on big lists of numbers at lightning speed; we
+    use it to compare the "meaning fingerprints" of questions. It's
+    optional - if it isn't installed we return None and the similarity
+    cache quietly switches itself off. Doing the probe in here means
+    Streamlit's constant re-runs never repeat the (slow) failed import.
+    """
+
+    try:
+        import numpy
+    except ImportError:
+        return None
+
+    return numpy
+
+
+@st.cache_resource
+def load_httpx():
+    """
+    Import httpx exactly once per process (or learn that it's missing)
+
+    'httpx' is a newer cousin of 'requests' that knows how to wait
+    without blocking and can speak the faster HTTP/2 protocol. It's
+    optional too - without it we fall back to 'requests' and everything
+    still works, just a little less fancy.
+    """
+
+    try:
+        import httpx
+    except ImportError:
+        return None
+
+    return httpx
+
+
+@st.cache_resource
+def accept_encoding():
+    """
+    Decide ONCE which compressed reply formats we can unpack
+
+    'brotli' squashes even smaller than gzip; if it's installed we tell
+    Mistral its replies are welcome in brotli too. We only ever
+    advertise what we can actually decode.
+    """
+
+    try:
+        import brotli  # noqa: F401 - we only need to know it's installed
+        return "gzip, br"
+    except ImportError:
+        return "gzip"
+
+
+# How alike two questions must be (0-1) before we treat them as the same
+SIMILARITY_THRESHOLD = 0.92
+
+# How many question fingerprints we keep per chat session
+SEMANTIC_CACHE_MAX_ENTRIES = 64
+
+
+@st.cache_resource
+def get_embedder():
+    """
+    This function loads ONE small 'meaning fingerprint' model and keeps it
+
+    The model (all-MiniLM-L6-v2) turns a sentence into a list of numbers
+    that captures its meaning, so "How do I reset my password?" and
+    "password reset steps?" end up with very similar numbers even though
+    the words differ.
+
+    sentence-transformers is optional and fairly heavy, so we import it
+    in here (not at the top of the file) and only on first use. If it
+    isn't installed we return None and the app quietly skips this cache.
+    """
+
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        return None
+
+    return SentenceTransformer("all-MiniLM-L6-v2")
+
+
+def get_semantic_cache():
+    """
+    Fetch this chat session's list of remembered questions
+
+    Each entry is a dictionary with:
+    - 'embedding': the meaning fingerprint of a past question
+    - 'prior': the frozen conversation that came BEFORE that question
+    - 'answer': what Mistral said back
+
+    It lives in st.session_state so each visitor has their own list.
+    """
+
+    if "semantic_cache" not in st.session_state:
+        st.session_state.semantic_cache = []
+
+    return st.session_state.semantic_cache
+
+
+def semantic_cache_lookup(prompt, prior_messages):
+    """
+    Check whether we already answered a question that MEANS the same thing
+
+    Returns a pair: (answer or None, fingerprint or None).
+    We hand back the fingerprint either way so the caller can file the
+    new answer later without computing it twice.
+    """
+
+    # Without numpy or the embedding model, this cache is switched off
+    np = load_numpy()
+    embedder = get_embedder()
+    if embedder is None or np is None:
+        return None, None
+
+    # Turn the new question into its meaning fingerprint
+    # normalize_embeddings=True scales it so a simple dot product
+    # gives us the cosine similarity directly
+    embedding = embedder.encode(prompt, normalize_embeddings=True)
+
+    entries = get_semantic_cache()
+    if not entries:
+        # Nothing remembered yet - definitely a miss
+        return None, embedding
+
+    # Stack every stored fingerprint into one matrix and compare them
+    # all against the new question in a single vectorized operation
+    matrix = np.stack([entry["embedding"] for entry in entries]).astype(np.float32)
+    scores = matrix @ embedding
+    best = int(np.argmax(scores))
+
+    # Freeze the conversation-so-far so we can compare it exactly
+    prior = tuple((m["role"], m["content"]) for m in prior_messages)
+
+    # Only reuse the answer if the question is close enough AND the
+    # conversation leading up to it was identical (context matters!)
+    if scores[best] > SIMILARITY_THRESHOLD and entries[best]["prior"] == prior:
+        # Move the winner to the end so it survives eviction longest
+        entries.append(entries.pop(best))
+        return entries[-1]["answer"], embedding
+
+    return None, embedding
+
+
+def semantic_cache_store(embedding, prior_messages, answer):
+    """
+    Remember a question's fingerprint and its answer for this session
+
+    Oldest entries fall off the front once the list is full.
+    """
+
+    # Nothing to store if the embedding model isn't available
+    if embedding is None:
+        return
+
+    entries = get_semantic_cache()
+    entries.append({
+        "embedding": embedding,
+        "prior": tuple((m["role"], m["content"]) for m in prior_messages),
+        "answer": answer
+    })
+
+    # Keep the list from growing forever
+    while len(entries) > SEMANTIC_CACHE_MAX_ENTRIES:
+        entries.pop(0)
+
+
+@st.cache_resource
+def get_http_session():
+    """
+    This function creates ONE 'Session' that we reuse for every message
+
+    Without a Session, every message opens a brand new connection to
+    Mistral AI (like dialing a phone number from scratch each time).
+    A Session keeps the line open, so follow-up messages skip the slow
+    "hello, it's me" handshake and go straight to talking.
+
+    @st.cache_resource tells Streamlit: "build this once and keep it",
+    even though Streamlit re-runs this whole script on every interaction.
+    """
+
+    # Create the Session (our reusable phone line to the internet)
+    session = requests.Session()
+
+    # An 'adapter' controls how connections are managed:
+    # - pool_connections / pool_maxsize: how many open lines to keep around
+    # - max_retries: automatically try again on temporary hiccups
+    #   (429 = "slow down", 5xx = "server had a bad moment")
+    adapter = HTTPAdapter(
+        pool_connections=4,  # Keep up to 4 connection pools
+        pool_maxsize=8,  # Each pool can hold up to 8 open connections
+        max_retries=Retry(
+            total=2,  # Try again at most 2 extra times
+            backoff_factor=0.3,  # Wait a little longer between each retry
+            status_forcelist=[429, 500, 502, 503, 504],  # Only retry these errors
+            allowed_methods=frozenset({"POST"})  # Every call we make is a POST -
+            # without this line the retries would never kick in, because
+            # urllib3 refuses to retry POSTs unless told it's safe
+        )
+    )
+
+    # Use this adapter for every secure (https) website we talk to
+    session.mount("https://", adapter)
+
+    return session
+    # Hand back the Session so everyone can share it
+
+
+# Build (or fetch the already-built) shared Session
+SESSION = get_http_session()
+
+# How many recent messages we send to Mistral each turn
+# (older ones get folded into a short summary instead)
+MAX_TURNS = 12
+
+# Refresh the summary after this many new messages pile up
+SUMMARY_REFRESH_EVERY = 6
+
+
+def summarize_conversation(messages, api_key):
+    """
+    Ask Mistral for a SHORT summary of some old messages
+
+    This is a small, cheap, non-streamed request. We use it to squeeze
+    the oldest part of a long conversation into a few sentences, so we
+    don't have to keep re-sending every old message forever.
+
+    Returns the summary text, or None if anything went wrong
+    (in which case we just keep using the previous summary).
+    """
+
+    url = "https://api.mistral.ai/v1/chat/completions"
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+
+    # Squash the old messages into one block of text to summarize
+    transcript = "\n".join(
+        f"{m['role']}: {m['content']}" for m in messages
+    )
+
+    payload = {
+        "model": MODEL,
+        "messages": [
+            {
+                "role": "user",
+                "content": (
+                    "Summarize the following conversation in a few short "
+                    "sentences, keeping any facts, names, and decisions "
+                    "that might matter later:\n\n" + transcript
+                )
+            }
+        ],
+        "temperature": 0.3,  # Summaries should be factual, not creative
+        "max_tokens": 200  # A summary should be short - that's the point
+    }
+
+    try:
+        response = SESSION.post(url, headers=headers, data=json_dumps(payload))
+        response.raise_for_status()
+        return json_loads(response.content)["choices"][0]["message"]["content"]
+
+    except requests.exceptions.RequestException:
+        # Summarizing is a nice-to-have; never break the chat over it
+        return None
+
+
+def refresh_summary_if_needed(api_key):
+    """
+    Keep the running summary of old messages up to date
+
+    We only bother when the conversation has outgrown the window, and
+    only every few messages (summarizing costs a small API call, so we
+    don't do it on every single turn).
+    """
+
+    messages = history_messages()
+
+    # Short conversation? Everything fits in the window, no summary needed
+    if len(messages) <= MAX_TURNS:
+        return
+
+    # Only refresh once enough NEW messages have piled up since the
+    # last refresh. (We count from the length at the last refresh
+    # rather than testing len % N == 0 - this function runs right
+    # after the user's message is added, when the length is always
+    # odd, so a plain modulo test would never fire.)
+    refreshed_at = st.session_state.get("summary_refreshed_at", 0)
+    if len(messages) - refreshed_at < SUMMARY_REFRESH_EVERY:
+        return
+
+    # Summarize exactly the messages that no longer fit in the window
+    summary = summarize_conversation(messages[:-MAX_TURNS], api_key)
+
+    if summary:
+        st.session_state.summary = summary
+        st.session_state.summary_refreshed_at = len(messages)
+        # Stash both in the app's memory: the summary itself for
+        # build_conversation_context, and where we were when we made it
+
+
+def build_conversation_context(messages):
+    """
+    Decide what we actually send to Mistral this turn
+
+    Instead of the whole history (which grows forever and costs more
+    tokens every single turn), we send:
+    - a system message holding the summary of everything old (if any)
+    - the last MAX_TURNS messages, word for word
+
+    So the request stays roughly the same size no matter how long
+    you've been chatting.
+    """
+
+    # The most recent messages, kept exactly as they were
+    context = messages[-MAX_TURNS:]
+
+    # If older messages got cut off and we have a summary of them,
+    # slide it in up front as a system message
+    summary = st.session_state.get("summary")
+    if summary and len(messages) > MAX_TURNS:
+        context = [
+            {
+                "role": "system",
+                "content": "Summary of the earlier conversation: " + summary
+            }
+        ] + context
+
+    return context
+
+
+# Where Mistral's server-side conversation store lives
+CONVERSATIONS_URL = "https://api.mistral.ai/v1/conversations"
+
+
+def history_fingerprint(messages):
+    """
+    Make a short fingerprint of a conversation
+
+    We use this to double-check that what Mistral's server remembers
+    matches what we have locally. If they ever drift apart (say, the
+    chat was cleared, or an answer came from our local cache and the
+    server never saw it), the fingerprints won't match and we know to
+    start a fresh server-side conversation.
+    """
+
+    frozen = [[m["role"], m["content"]] for m in messages]
+    return hashlib.sha256(json_dumps(frozen)).hexdigest()
+
+
+def get_conversation_response(messages, api_key):
+    """
+    Ask Mistral using a SERVER-SIDE conversation
+
+    Normally we re-send the whole chat every turn and Mistral re-reads
+    it all from scratch. With a server-side conversation, Mistral keeps
+    the history on its end: after the first turn we only upload the ONE
+    new message, no matter how long the chat gets.
+
+    Returns the complete answer as text (this path isn't streamed).
+    """
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+
+    # The message you just typed (the only thing the server hasn't seen)
+    new_message = messages[-1]
+
+    # Do we already have a server-side conversation, and does the
+    # server's memory of it still match our local history?
+    conv_id = st.session_state.get("conv_id")
+    if conv_id and st.session_state.get("conv_fingerprint") != history_fingerprint(messages[:-1]):
+        # Out of sync - abandon the old conversation and start over
+        conv_id = None
+
+    try:
+        if conv_id is None:
+            # First turn (or a restart): create the conversation,
+            # sending everything the server needs to catch up
+            payload = {
+                "model": MODEL,
+                "inputs": messages,
+                "completion_args": {
+                    "temperature": TEMPERATURE,
+                    "max_tokens": MAX_TOKENS
+                }
+            }
+            response = SESSION.post(CONVERSATIONS_URL, headers=headers, data=json_dumps(payload))
+        else:
+            # Every later turn: append just the new message
+            payload = {"inputs": [new_message]}
+            response = SESSION.post(
+                f"{CONVERSATIONS_URL}/{conv_id}", headers=headers, data=json_dumps(payload)
+            )
+
+        response.raise_for_status()
+        result = json_loads(response.content)
+
+        # Remember which conversation the server filed this under
+        st.session_state.conv_id = result.get("conversation_id", conv_id)
+
+        # The answer is the last 'output'; its content is usually plain
+        # text but can arrive as a list of pieces, so handle both
+        content = result["outputs"][-1]["content"]
+        if isinstance(content, list):
+            content = "".join(piece.get("text", "") for piece in content)
+
+        # Record what the server now remembers, for next turn's check
+        st.session_state.conv_fingerprint = history_fingerprint(
+            messages + [{"role": "assistant", "content": content}]
+        )
+
+        return content
+
+    except (requests.exceptions.RequestException, KeyError, IndexError) as e:
+        # Forget the conversation so next turn starts clean
+        st.session_state.pop("conv_id", None)
+        st.session_state.pop("conv_fingerprint", None)
+        return f"❌ Error: {str(e)}\n\nPlease check your API key and try again."
+
+
 def get_mistral_response(messages, api_key):
     """
-    This function sends your messages to Mistral AI and gets a response back
-    
+    This function sends your messages to Mistral AI and streams the response back
+
     Think of it like:
     - You write a letter (messages)
     - You put it in an envelope with a stamp (api_key)
     - You send it to Mistral AI
-    - They read it and write back
+    - They read it and phone you back, speaking one word at a time
+
+    It is a 'generator': instead of returning the whole answer at once,
+    it 'yields' each little piece of text as soon as it arrives.
+    That way you start reading the answer immediately instead of
+    staring at a spinner until the whole thing is done.
     """
-    
+
     # The URL where Mistral AI lives on the internet
     url = "https://api.mistral.ai/v1/chat/completions"
-    
+
     # The headers are like the envelope for our letter
     # They tell Mistral who we are and what we're sending
     headers = {
         "Content-Type": "application/json",  # We're sending JSON data
-        "Authorization": f"Bearer {api_key}"  # This is our API key (like a password)
-    }
-    
-    # The payload is the actual letter we're sending
-    # It contains all our messages and settings
-    payload = {
-        "model": "mistral-small-latest",  # Which AI brain to use
-        "messages": messages,  # All our conversation so far
-        "temperature": 0.7,  # How creative the AI should be (0-1, higher = more creative)
-        "max_tokens": 1000  # Maximum length of response (like a word limit)
+        "Authorization": f"Bearer {api_key}",  # This is our API key (like a password)
+        "Accept-Encoding": accept_encoding()  # "Feel free to squash your reply"
     }
-    
+
+    # The payload is the actual letter we're sending: the pre-encoded
+    # constant settings plus this turn's messages (see build_payload_bytes)
+    # - squashed with gzip if that's enabled and the body has grown big
+    body = compress_if_large(build_payload_bytes(messages), headers)
+
     try:
         # 'try' means: "Try to do this, but if something goes wrong, don't crash!"
-        
-        # Send our request to Mistral AI
-        response = requests.post(url, headers=headers, json=payload)
+
+        # Send our request to Mistral AI through our shared Session
+        # (the Session reuses the open connection from last time)
+        # stream=True tells 'requests' not to wait for the whole answer
+        # before giving us the response object
+        response = SESSION.post(url, headers=headers, data=body, stream=True)
         # 'post' means we're sending data (like mailing a letter)
-        
+
         # Check if it worked
         response.raise_for_status()
         # This will give an error if something went wrong
-        
-        # Get the AI's reply from the response
-        result = response.json()
-        # Convert the response to a format we can use
-        
-        # Extract just the text of the reply
-        assistant_message = result['choices'][0]['message']['content']
-        # This digs into the response to find the actual message text
-        
-        return assistant_message
-        # Send back the AI's reply
-        
+
+        # Read the answer one line at a time as it arrives over the network
+        # Mistral sends "Server-Sent Events": each line looks like
+        #   data: {"choices": [{"delta": {"content": "Hello"}}]}
+        #
+        # This loop runs once per chunk, hundreds of times per answer,
+        # so we bind the helpers we use to LOCAL names first - Python
+        # finds locals faster than globals, and it adds up in here
+        _match = SSE_DATA_BYTES.match
+        _loads = json_loads
+
+        for line in response.iter_lines():
+
+            # Match "data: <payload>" in one compiled-pattern step
+            # (blank separator lines and anything else fall through)
+            m = _match(line) if line else None
+            if not m:
+                continue
+            data = m.group(1)
+
+            # The very last event is the literal text "[DONE]" - that's
+            # Mistral's way of saying "I'm finished talking"
+            if data == b"[DONE]":
+                break
+
+            # Extract just the new piece of text from this chunk
+            # (some chunks carry no text, e.g. the final "stop" chunk,
+            # so we default to an empty string)
+            delta = _loads(data)["choices"][0]["delta"].get("content", "")
+
+            if delta:
+                yield delta
+                # 'yield' hands this piece of text to whoever is reading
+                # the stream, then waits here for the next chunk
+
     except requests.exceptions.RequestException as e:
         # If something went wrong, we end up here
-        
-        return f"❌ Error: {str(e)}\n\nPlease check your API key and try again."
-        # Return an error message to show the user
+
+        yield f"❌ Error: {str(e)}\n\nPlease check your API key and try again."
+        # Yield an error message to show the user
+
+
+@st.cache_resource
+def get_async_client():
+    """
+    This function creates ONE async httpx client (plus its own event loop)
+    and keeps them for the life of the app
+
+    The 'event loop' is like a switchboard operator: while one call is
+    waiting for Mistral to answer, the operator can handle other calls
+    instead of sitting idle. We keep the loop and the client together
+    because the client only works on the loop it was born on.
+
+    Streamlit gives every visitor their own thread, and an event loop
+    can only be driven from ONE thread at a time - so we park the loop
+    on its own dedicated background thread, running forever, and every
+    session hands it work from a safe distance (see the bridge below).
+    """
+
+    # Fetch the lazily-imported httpx module (cached after first use)
+    httpx = load_httpx()
+
+    # If uvloop is installed, switch to it before building our loop -
+    # it's a drop-in, much faster engine for asyncio (this function
+    # runs once per process, so the install happens exactly once)
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        # Not installed? The standard event loop works fine too
+        pass
+
+    # Create a fresh event loop that belongs to this app
+    loop = asyncio.new_event_loop()
+
+    # Start the loop spinning on its own background thread
+    # daemon=True means the thread won't stop Python from exiting
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    # Create the async client
+    # http2=True lets several requests share one connection side by side
+    # timeout=60 means "give up if Mistral says nothing for a minute"
+    client = httpx.AsyncClient(http2=True, timeout=60)
+
+    return loop, client
+    # Hand back both so the bridge below can use them
+
+
+async def _get_mistral_response_async(messages, api_key):
+    """
+    The async twin of get_mistral_response
+
+    It does exactly the same job (send messages, stream back pieces of
+    the answer) but it 'awaits' instead of blocking, so the event loop
+    is free to serve other chats while the bytes travel.
+    """
+
+    # The URL where Mistral AI lives on the internet
+    url = "https://api.mistral.ai/v1/chat/completions"
+
+    # Same envelope as the sync version
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+        "Accept-Encoding": accept_encoding()
+    }
+
+    # Same letter as the sync version: pre-encoded settings + messages,
+    # squashed with gzip if that's enabled and the body has grown big
+    body = compress_if_large(build_payload_bytes(messages), headers)
+
+    # Grab the lazily-imported module and the shared client
+    # (the loop is handled by the bridge below)
+    httpx = load_httpx()
+    _, client = get_async_client()
+
+    try:
+        # Open the streamed request; 'async with' cleans up for us
+        # (content= lets us hand over our pre-encoded bytes directly
+        # instead of letting httpx encode them)
+        async with client.stream("POST", url, content=body, headers=headers) as response:
+
+            # Complain loudly if Mistral said "no"
+            response.raise_for_status()
+
+            # Same local-name trick as the sync version: this loop is
+            # the hot path, so skip the global lookups inside it
+            # (httpx gives us text lines, so we use the text pattern)
+            _match = SSE_DATA_TEXT.match
+            _loads = json_loads
+
+            # Read the answer one line at a time, without blocking
+            async for line in response.aiter_lines():
+
+                # Match "data: <payload>" in one compiled-pattern step
+                m = _match(line) if line else None
+                if not m:
+                    continue
+                data = m.group(1)
+
+                # "[DONE]" means Mistral has finished talking
+                if data == "[DONE]":
+                    break
+
+                # Dig the new piece of text out of the JSON chunk
+                delta = _loads(data)["choices"][0]["delta"].get("content", "")
+
+                if delta:
+                    yield delta
+
+    except httpx.HTTPError as e:
+        # Network trouble or a bad status code lands here
+
+        yield f"❌ Error: {str(e)}\n\nPlease check your API key and try again."
+
+
+# If this is set (e.g. "http://localhost:8000"), the app sends its
+# requests through the async backend in server.py instead of talking
+# to Mistral directly - handy when many people share one deployment
+BACKEND_URL = os.environ.get("MISTRAL_BACKEND_URL", "")
+
+
+def stream_backend_response(messages, api_key):
+    """
+    Stream the answer through our own backend server (see server.py)
+
+    The backend does the waiting on its async event loop, so one small
+    server can juggle many simultaneous chats. From our side it looks
+    just like talking to Mistral: we POST the conversation and read
+    back pieces of plain text as they arrive.
+    """
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"  # Forwarded to Mistral, never stored
+    }
+
+    payload = {
+        "model": MODEL,
+        "messages": messages,
+        "temperature": TEMPERATURE,
+        "max_tokens": MAX_TOKENS
+    }
+
+    try:
+        response = SESSION.post(
+            BACKEND_URL.rstrip("/") + "/chat",
+            headers=headers,
+            data=json_dumps(payload),
+            stream=True
+        )
+        response.raise_for_status()
+
+        # The backend already did the SSE unwrapping for us, so we
+        # just read plain text pieces as they come off the wire
+        for piece in response.iter_content(chunk_size=None, decode_unicode=True):
+            if piece:
+                yield piece
+
+    except requests.exceptions.RequestException as e:
+        yield f"❌ Error: {str(e)}\n\nIs the backend server running?"
+
+
+def stream_mistral_response(messages, api_key):
+    """
+    A 'bridge' that lets normal (sync) Streamlit code read the async stream
+
+    Streamlit's st.write_stream expects a plain generator, so this
+    function asks the background event loop for one piece at a time
+    (run_coroutine_threadsafe is the thread-safe way to hand work to a
+    loop living on another thread) and yields each piece like a
+    regular generator. Many sessions can do this at once without
+    stepping on each other.
+    If a backend server is configured, we hand the job to it instead;
+    if httpx isn't installed, it simply uses the 'requests' version.
+    """
+
+    if BACKEND_URL:
+        # A backend is configured - let it do the async heavy lifting
+        yield from stream_backend_response(messages, api_key)
+        return
+
+    if load_httpx() is None:
+        # No httpx? No problem - use the tried-and-true sync path
+        yield from get_mistral_response(messages, api_key)
+        return
+
+    # Fetch our long-lived loop and start the async generator
+    loop, _ = get_async_client()
+    stream = _get_mistral_response_async(messages, api_key)
+
+    while True:
+        try:
+            # Hand "fetch the next piece" to the background loop and
+            # wait here for the answer - safe from any session thread
+            yield asyncio.run_coroutine_threadsafe(stream.__anext__(), loop).result()
+        except StopAsyncIteration:
+            # The async generator is out of pieces - we're done
+            break
+
 
 # --------------------------------------------
-# STEP 8: Handle User Input (Chat Box at Bottom)
+# STEP 8: The Chat Panel (history + input, in a fragment)
 # --------------------------------------------
 
-if prompt := st.chat_input("Type your message here..."):
-    # This creates a chat input box at the bottom
-    # 'prompt' will contain whatever you type
-    # The ':=' is a special way to both check if something exists AND save it
+@st.fragment
+def chat_panel():
+    """
+    The chat itself: the message history plus the input box
+
+    @st.fragment tells Streamlit this function is its own little
+    island: when you send a message, ONLY this function re-runs -
+    the title, the sidebar, and everything else on the page are
+    left alone instead of being rebuilt from scratch every time.
+    """
+
+    # ----------------------------------------
+    # Show the conversation so far
+    # ----------------------------------------
+
+    for role, content in zip(st.session_state.roles, st.session_state.contents):
+        # This walks the two parallel history lists in step
+        # It's like reading through your text message history
+
+        with st.chat_message(role):
+            # This creates a chat bubble
+            # 'role' tells us if it's from "user" or "assistant"
+
+            st.markdown(render_message_text(content))
+            # This displays the actual message text inside the bubble
+            # (fetched through the cache so re-runs cost almost nothing)
+
+    # ----------------------------------------
+    # Handle new input
+    # ----------------------------------------
+
+    if prompt := st.chat_input("Type your message here..."):
+        # This creates a chat input box at the bottom
+        # 'prompt' will contain whatever you type
+        # The ':=' is a special way to both check if something exists AND save it
     
-    # --------------------------------------------
-    # Check if API key is entered
-    # --------------------------------------------
+        # --------------------------------------------
+        # Check if API key is entered
+        # --------------------------------------------
     
-    if not api_key:
-        # 'not' means "if this is empty or missing"
+        if not api_key:
+            # 'not' means "if this is empty or missing"
         
-        st.error("⚠️ Please enter your Mistral API key in the sidebar first!")
-        # Show an error message in red
+            st.error("⚠️ Please enter your Mistral API key in the sidebar first!")
+            # Show an error message in red
         
-        st.stop()
-        # Stop here and don't continue
+            st.stop()
+            # Stop here and don't continue
     
-    # --------------------------------------------
-    # Save and display user's message
-    # --------------------------------------------
+        # --------------------------------------------
+        # Save and display user's message
+        # --------------------------------------------
     
-    # Add what you typed to the chat history
-    st.session_state.messages.append({
-        "role": "user",  # This message is from you
-        "content": prompt  # This is what you typed
-    })
-    # 'append' means "add to the end of the list"
+        # Add what you typed to the chat history
+        append_history(
+            "user",  # This message is from you
+            prompt  # This is what you typed
+        )
+        # This adds to the end of both parallel history lists
     
-    # Display your message in a chat bubble
-    with st.chat_message("user"):
-        st.markdown(prompt)
+        # Display your message in a chat bubble
+        with st.chat_message("user"):
+            st.markdown(prompt)
     
-    # --------------------------------------------
-    # Get AI response and display it
-    # --------------------------------------------
+        # --------------------------------------------
+        # Get AI response and display it
+        # --------------------------------------------
     
-    # Create a chat bubble for the AI's response
-    with st.chat_message("assistant"):
-        
-        # Create a placeholder where we'll show the response
-        message_placeholder = st.empty()
-        
-        # Show a "thinking" message while we wait
-        with st.spinner("🤔 Thinking..."):
-            
-            # Call our function to get Mistral AI's response
-            full_response = get_mistral_response(
-                st.session_state.messages,  # Send all our conversation
-                api_key  # Send our API key
-            )
-        
-        # Display the AI's response
-        message_placeholder.markdown(full_response)
+        # Zip the parallel history lists back into the shape the
+        # API (and our caches) expect, once for this whole turn
+        messages = history_messages()
+
+        # Before asking Mistral, check our answer notebook:
+        # maybe this exact conversation has already been answered
+        cache_key = make_cache_key(messages, api_key)
+        cached_response = cache_lookup(cache_key)
+
+        # The conversation BEFORE the question you just typed
+        # (used by the similarity cache to make sure context matches)
+        prior_messages = messages[:-1]
+
+        # No exact match? Check whether a differently-worded version of
+        # the same question was already answered in this session
+        prompt_embedding = None
+        if cached_response is None:
+            cached_response, prompt_embedding = semantic_cache_lookup(prompt, prior_messages)
+
+        # Create a chat bubble for the AI's response
+        with st.chat_message("assistant"):
+
+            if cached_response is not None:
+                # Cache hit! Show the saved answer instantly -
+                # no network, no waiting, no API cost
+                st.markdown(cached_response)
+                full_response = cached_response
+
+            elif use_server_conversation:
+                # The server remembers our history, so we only send the
+                # newest message and show the answer when it lands
+                # (this path trades the typewriter effect for tiny uploads)
+                full_response = get_conversation_response(
+                    messages,
+                    api_key
+                )
+                st.markdown(full_response)
+
+                # Save the finished answer for next time, like below
+                if not full_response.startswith("❌"):
+                    cache_store(cache_key, full_response)
+                    semantic_cache_store(prompt_embedding, prior_messages, full_response)
+
+            else:
+                # Cache miss - ask Mistral and stream the answer in
+
+                # First, make sure the summary of old messages is fresh
+                refresh_summary_if_needed(api_key)
+
+                # st.status draws a little "Thinking..." box that shows
+                # a live spinner WHILE the tokens stream in below it -
+                # so you see progress from the very first word, not
+                # just when the whole answer is finished
+                with st.status("🤔 Thinking...", expanded=True) as status:
+
+                    # Stream Mistral AI's response straight onto the page
+                    # st.write_stream reads our generator piece by piece and shows
+                    # each piece the moment it arrives (a typewriter effect),
+                    # then hands us back the complete text when it's done
+                    full_response = st.write_stream(
+                        stream_mistral_response(
+                            # Send the recent conversation (plus a summary of
+                            # anything older) instead of the whole history
+                            build_conversation_context(messages),
+                            api_key  # Send our API key
+                        )
+                    )
+
+                    # Flip the box from "thinking" to "done" - the green
+                    # tick tells you the answer above is complete
+                    status.update(label="✅ Done", state="complete", expanded=True)
+
+                # Save the finished answer for next time
+                # (but don't save error messages - those aren't real answers)
+                if not full_response.startswith("❌"):
+                    cache_store(cache_key, full_response)
+                    semantic_cache_store(prompt_embedding, prior_messages, full_response)
     
-    # --------------------------------------------
-    # Save AI's response to chat history
-    # --------------------------------------------
+        # --------------------------------------------
+        # Save AI's response to chat history
+        # --------------------------------------------
     
-    st.session_state.messages.append({
-        "role": "assistant",  # This message is from the AI
-        "content": full_response  # This is what the AI said
-    })
+        append_history(
+            "assistant",  # This message is from the AI
+            full_response  # This is what the AI said
+        )
+
+# Draw the chat panel (history + input box)
+chat_panel()
 
 # --------------------------------------------
 # STEP 9: Add Instructions at the Bottom
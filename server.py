@@ -0,0 +1,330 @@
+# ============================================
+# MISTRAL AI CHATBOT - OPTIONAL BACKEND SERVER
+# ============================================
+# This is a small helper server for deployments with MANY users.
+#
+# Why does it exist? Streamlit gives every visitor their own thread,
+# and each thread used to sit and block while waiting for Mistral.
+# This server is 'async': one event loop juggles all the waiting, so
+# hundreds of chats can be in flight at once without hundreds of
+# stuck threads.
+#
+# Run it with:
+#     uvicorn server:app --port 8000
+#
+# Then point the Streamlit app at it:
+#     export MISTRAL_BACKEND_URL=http://localhost:8000
+#
+# If you don't run it, the Streamlit app simply talks to Mistral
+# directly, exactly like before.
+
+import asyncio
+# Lets the batching code wait, queue, and juggle jobs without blocking
+
+import json
+# For decoding the streamed answer pieces
+
+import re
+# For the pre-compiled pattern that picks apart streamed lines
+
+import uuid
+# For giving each queued question a unique ticket number
+
+import httpx
+# The async internet client that does the actual talking to Mistral
+
+from fastapi import FastAPI, Header
+# FastAPI turns our Python functions into web endpoints
+
+from fastapi.responses import StreamingResponse
+# Lets us forward the answer piece by piece instead of all at once
+
+from pydantic import BaseModel
+# Describes what a valid request body looks like
+
+try:
+    import uvloop
+    uvloop.install()
+    # 'uvloop' swaps Python's event loop for one built on libuv (the
+    # engine under Node.js) - roughly twice the throughput when lots
+    # of streams are in flight, with zero changes to our code
+except ImportError:
+    # Not installed? The standard event loop works fine too
+    pass
+
+# The URL where Mistral AI lives on the internet
+MISTRAL_URL = "https://api.mistral.ai/v1/chat/completions"
+
+# Compiled once at import: matching "data: <payload>" runs in C,
+# and this happens hundreds of times per streamed answer
+SSE_DATA = re.compile(r"^data: (.*)$")
+
+# Where Mistral's batch machinery lives (file upload + batch jobs)
+MISTRAL_FILES_URL = "https://api.mistral.ai/v1/files"
+MISTRAL_BATCH_URL = "https://api.mistral.ai/v1/batch/jobs"
+
+# Batching knobs: how long we hold the door open for stragglers,
+# how many questions fit in one batch, and how patiently we poll
+BATCH_WINDOW_SECONDS = 0.05  # Wait up to 50 ms for more questions
+BATCH_MAX_ITEMS = 16  # Then ship at most this many together
+BATCH_POLL_SECONDS = 2  # Check on the job every 2 seconds
+BATCH_TIMEOUT_SECONDS = 600  # Give up after 10 minutes
+
+# One shared async client for the whole server
+# (connections to Mistral are pooled and kept alive across requests)
+client = httpx.AsyncClient(http2=True, timeout=60)
+
+# The server itself
+app = FastAPI(title="Mistral Chatbot Backend")
+
+
+class ChatRequest(BaseModel):
+    """What the Streamlit app sends us: the conversation plus settings"""
+
+    messages: list  # The conversation, as [{"role": ..., "content": ...}]
+    model: str = "mistral-small-latest"  # Which AI brain to use
+    temperature: float = 0.7  # How creative the AI should be
+    max_tokens: int = 1000  # Maximum length of response
+
+
+@app.post("/chat")
+async def chat(request: ChatRequest, authorization: str = Header(default="")):
+    """
+    Stream a Mistral answer back to the caller, piece by piece
+
+    The caller's Authorization header (their Mistral API key) is
+    forwarded untouched - this server never stores any keys.
+    """
+
+    payload = {
+        "model": request.model,
+        "messages": request.messages,
+        "temperature": request.temperature,
+        "max_tokens": request.max_tokens,
+        "stream": True
+    }
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": authorization
+    }
+
+    async def token_stream():
+        # Open the streamed request to Mistral and relay each piece
+        # of text the moment it arrives - 'await' points are where
+        # the event loop is free to serve other chats
+        try:
+            async with client.stream("POST", MISTRAL_URL, json=payload, headers=headers) as response:
+                response.raise_for_status()
+
+                # Bind the hot helpers to local names: this loop runs
+                # once per token, so local lookups pay off here
+                _match = SSE_DATA.match
+                _loads = json.loads
+
+                async for line in response.aiter_lines():
+                    # Mistral speaks Server-Sent Events: match the
+                    # "data: <payload>" shape, stop at "[DONE]"
+                    m = _match(line) if line else None
+                    if not m:
+                        continue
+                    data = m.group(1)
+                    if data == "[DONE]":
+                        break
+
+                    delta = _loads(data)["choices"][0]["delta"].get("content", "")
+                    if delta:
+                        yield delta
+
+        except httpx.HTTPError as e:
+            yield f"❌ Error: {str(e)}\n\nPlease check your API key and try again."
+
+    # StreamingResponse forwards each yielded piece straight to the
+    # caller, so they see tokens as fast as we do
+    return StreamingResponse(token_stream(), media_type="text/plain")
+
+
+# --------------------------------------------
+# Batch mode (for non-interactive work)
+# --------------------------------------------
+# Streaming is great for a person watching the screen, but some jobs
+# don't have a person waiting: regenerating old answers, offline
+# evaluations, bulk processing. For those, Mistral's batch API is much
+# cheaper per request. The code below collects questions that arrive
+# within a short window, ships them to Mistral as ONE batch job, then
+# hands each caller their own answer when the job finishes.
+
+# The waiting room: questions queue up here until a batch departs
+_batch_queue: asyncio.Queue = asyncio.Queue()
+
+# The background worker that drives the waiting room (started lazily)
+_batch_worker_task = None
+
+
+async def _ensure_batch_worker():
+    """Start the background batch worker the first time anyone needs it"""
+
+    global _batch_worker_task
+    if _batch_worker_task is None:
+        _batch_worker_task = asyncio.create_task(_batch_worker())
+
+
+async def _batch_worker():
+    """
+    Forever: wait for one question, hold the door 50 ms for more,
+    then send the whole group off as one batch job
+    """
+
+    while True:
+        # Block until at least one question shows up
+        batch = [await _batch_queue.get()]
+
+        # Keep collecting until the window closes or the batch is full
+        while len(batch) < BATCH_MAX_ITEMS:
+            try:
+                batch.append(
+                    await asyncio.wait_for(_batch_queue.get(), BATCH_WINDOW_SECONDS)
+                )
+            except asyncio.TimeoutError:
+                break
+
+        # Different callers may use different API keys, and a batch
+        # job runs under exactly one key - so group by key first
+        groups = {}
+        for item in batch:
+            groups.setdefault(item["authorization"], []).append(item)
+
+        # Fire off one job per key; they run independently
+        for authorization, items in groups.items():
+            asyncio.create_task(_run_batch_job(authorization, items))
+
+
+async def _run_batch_job(authorization, items):
+    """
+    Push one group of questions through Mistral's batch pipeline:
+    upload a file of questions, start the job, poll until done,
+    download the answers, and wake up every waiting caller
+    """
+
+    headers = {"Authorization": authorization}
+
+    # Step 1: write the questions into JSONL (one JSON object per line),
+    # each tagged with its ticket number so we can match answers back
+    lines = []
+    for item in items:
+        lines.append(json.dumps({
+            "custom_id": item["id"],
+            "body": {
+                "model": item["model"],
+                "messages": item["messages"],
+                "temperature": item["temperature"],
+                "max_tokens": item["max_tokens"]
+            }
+        }))
+    batch_file = "\n".join(lines).encode("utf-8")
+
+    try:
+        # Step 2: upload the file of questions
+        upload = await client.post(
+            MISTRAL_FILES_URL,
+            headers=headers,
+            data={"purpose": "batch"},
+            files={"file": ("batch.jsonl", batch_file)}
+        )
+        upload.raise_for_status()
+        file_id = upload.json()["id"]
+
+        # Step 3: start the batch job
+        job = await client.post(
+            MISTRAL_BATCH_URL,
+            headers=headers,
+            json={
+                "input_files": [file_id],
+                "endpoint": "/v1/chat/completions",
+                "model": items[0]["model"]
+            }
+        )
+        job.raise_for_status()
+        job_id = job.json()["id"]
+
+        # Step 4: check on the job every couple of seconds until it's done
+        waited = 0
+        while True:
+            await asyncio.sleep(BATCH_POLL_SECONDS)
+            waited += BATCH_POLL_SECONDS
+
+            status = await client.get(f"{MISTRAL_BATCH_URL}/{job_id}", headers=headers)
+            status.raise_for_status()
+            job_state = status.json()
+
+            if job_state["status"] == "SUCCESS":
+                break
+            if job_state["status"] in ("FAILED", "CANCELLED", "TIMEOUT_EXCEEDED"):
+                raise RuntimeError(f"Batch job ended with status {job_state['status']}")
+            if waited >= BATCH_TIMEOUT_SECONDS:
+                raise RuntimeError("Batch job took too long")
+
+        # Step 5: download the answers and sort them by ticket number
+        output = await client.get(
+            f"{MISTRAL_FILES_URL}/{job_state['output_file']}/content",
+            headers=headers
+        )
+        output.raise_for_status()
+
+        answers = {}
+        for line in output.text.splitlines():
+            if not line:
+                continue
+            record = json.loads(line)
+            answers[record["custom_id"]] = (
+                record["response"]["body"]["choices"][0]["message"]["content"]
+            )
+
+        # Step 6: hand each caller their answer
+        for item in items:
+            if not item["future"].done():
+                item["future"].set_result(
+                    answers.get(item["id"], "❌ Error: no answer came back for this request.")
+                )
+
+    except Exception as e:
+        # If anything went wrong, every caller in this group finds out
+        for item in items:
+            if not item["future"].done():
+                item["future"].set_result(f"❌ Error: {str(e)}")
+
+
+@app.post("/chat/batch")
+async def chat_batch(request: ChatRequest, authorization: str = Header(default="")):
+    """
+    The non-streaming, batched sibling of /chat
+
+    Use this for background work where nobody is watching a screen:
+    the answer arrives when the batch job finishes (which can take a
+    while), in exchange for a much lower per-request cost.
+    """
+
+    await _ensure_batch_worker()
+
+    # Create a 'future' - an empty box the batch worker will fill in
+    future = asyncio.get_running_loop().create_future()
+
+    # Drop our question in the waiting room with a unique ticket
+    await _batch_queue.put({
+        "id": uuid.uuid4().hex,
+        "future": future,
+        "messages": request.messages,
+        "model": request.model,
+        "temperature": request.temperature,
+        "max_tokens": request.max_tokens,
+        "authorization": authorization
+    })
+
+    # Sleep until the box is filled, then hand the answer back
+    return {"content": await future}
+
+
+if __name__ == "__main__":
+    # Convenience: 'python server.py' also works
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=8000)